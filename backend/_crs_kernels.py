@@ -0,0 +1,151 @@
+"""
+Compiled CRS kernels
+====================
+
+Numba versions of the CRSScorer components over the TransactionGraph CSR
+arrays. A cycle is an int32 array of node ids plus the matching array of edge
+ids, where edge ``k`` runs from ``cycle[k]`` to ``cycle[(k + 1) % len(cycle)]``.
+"""
+
+import numpy as np
+from numba import njit
+
+from ingest import MISSING_TS
+
+
+@njit(cache=True)
+def _clamp01(x):
+    return max(0.0, min(1.0, x))
+
+
+@njit(cache=True)
+def length_score_nb(L, min_len, max_len):
+    return _clamp01((max_len - L + 1) / (max_len - min_len + 1))
+
+
+@njit(cache=True)
+def amount_sim_nb(edge_ids, total_amount, weight):
+    n = edge_ids.shape[0]
+    if n == 0:
+        return 0.0
+
+    # Welford: mean and sample variance of per-edge average amounts.
+    mean = 0.0
+    m2 = 0.0
+    for k in range(n):
+        e = edge_ids[k]
+        x = total_amount[e] / weight[e]
+        delta = x - mean
+        mean += delta / (k + 1)
+        m2 += delta * (x - mean)
+
+    if mean == 0:
+        return 0.0
+
+    if n == 1:
+        return 1.0
+
+    std = np.sqrt(m2 / (n - 1))
+    return _clamp01(1 - std / mean)
+
+
+@njit(cache=True)
+def time_score_nb(edge_ids, ts_first, ts_last, ts_count, max_duration):
+    # Edges without timestamps hold (int64 max, int64 min) and drop out.
+    count = 0
+    lo = ts_first[edge_ids[0]]
+    hi = ts_last[edge_ids[0]]
+    for k in range(edge_ids.shape[0]):
+        e = edge_ids[k]
+        count += ts_count[e]
+        lo = min(lo, ts_first[e])
+        hi = max(hi, ts_last[e])
+
+    if count < 2:
+        return 0.5
+
+    return _clamp01(1 - (hi - lo) / max_duration)
+
+
+@njit(cache=True)
+def completed_passes_nb(edge_ids, meta_indptr, meta_ts, limit):
+    """
+    Disjoint time-ordered passes around the cycle, counted up to ``limit``.
+
+    A pass uses one transaction per edge, each no earlier than the one on
+    the previous edge, and may start on any edge. Per rotation, passes are
+    taken greedily from the earliest unused transactions; ``meta_ts`` is
+    sorted within each edge. Transactions without a timestamp cannot be
+    placed in time order and take part in no pass, on any edge.
+    """
+    L = edge_ids.shape[0]
+    ptr = np.empty(L, np.int64)
+    best = 0
+
+    for r in range(L):
+        # Undated transactions (MISSING_TS) sort first; start past them.
+        for k in range(L):
+            e = edge_ids[(r + k) % L]
+            ptr[k] = meta_indptr[e]
+            while ptr[k] < meta_indptr[e + 1] and meta_ts[ptr[k]] == MISSING_TS:
+                ptr[k] += 1
+
+        passes = 0
+        while passes < limit:
+            t = MISSING_TS
+            complete = True
+            for k in range(L):
+                end = meta_indptr[edge_ids[(r + k) % L] + 1]
+                while ptr[k] < end and meta_ts[ptr[k]] < t:
+                    ptr[k] += 1
+                if ptr[k] == end:
+                    complete = False
+                    break
+                t = meta_ts[ptr[k]]
+                ptr[k] += 1
+            if not complete:
+                break
+            passes += 1
+
+        best = max(best, passes)
+        if best == limit:
+            break
+
+    return best
+
+
+@njit(cache=True)
+def frequency_score_nb(edge_ids, meta_indptr, meta_ts, full_passes):
+    return _clamp01(completed_passes_nb(edge_ids, meta_indptr, meta_ts, full_passes) / full_passes)
+
+
+@njit(cache=True)
+def volume_score_nb(cycle, edge_ids, total_amount, out_totals):
+    cycle_volume = 0.0
+    for k in range(edge_ids.shape[0]):
+        cycle_volume += total_amount[edge_ids[k]]
+
+    total_outgoing = 0.0
+    for k in range(cycle.shape[0]):
+        total_outgoing += out_totals[cycle[k]]
+
+    if total_outgoing == 0:
+        return 0.0
+
+    return _clamp01(cycle_volume / total_outgoing)
+
+
+@njit(cache=True)
+def compute_crs_nb(cycle, edge_ids, weight, total_amount,
+                   ts_first, ts_last, ts_count, meta_indptr, meta_ts, out_totals, weights,
+                   min_len, max_len, max_duration, full_passes):
+    """Weighted CRS in [0, 1]; ``weights`` is (length, amount, time, frequency, volume)."""
+    raw = (
+        weights[0] * length_score_nb(cycle.shape[0], min_len, max_len) +
+        weights[1] * amount_sim_nb(edge_ids, total_amount, weight) +
+        weights[2] * time_score_nb(edge_ids, ts_first, ts_last, ts_count, max_duration) +
+        weights[3] * frequency_score_nb(edge_ids, meta_indptr, meta_ts, full_passes) +
+        weights[4] * volume_score_nb(cycle, edge_ids, total_amount, out_totals)
+    )
+
+    return _clamp01(raw)
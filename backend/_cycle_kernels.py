@@ -0,0 +1,225 @@
+"""
+Compiled kernels for circular fund routing
+==========================================
+
+Strongly connected components and bounded simple-cycle enumeration over
+CSR adjacency arrays.
+
+Every cycle is rooted at its smallest vertex id (Johnson's ordering): the
+search from start vertex ``s`` only walks vertices ``> s`` in the same SCC,
+so each cycle is produced exactly once and already in normal form. Each
+start vertex is searched once; blocks of start vertices are handed out
+dynamically to threads (one per numba thread) and run without the GIL.
+"""
+
+import itertools
+import threading
+
+import numpy as np
+from numba import get_num_threads, njit
+
+from ingest import MISSING_TS
+
+# Start vertices per scheduling block. Small blocks keep cores busy when a
+# few hub-adjacent start vertices own most of the search tree.
+TASK_CHUNK = 32
+
+
+@njit(cache=True, nogil=True)
+def _search(start, indptr, indices, comp, min_len, max_len, out, out_pos):
+    """Enumerate cycles rooted at ``start``; returns the number found.
+
+    Cycle ``k`` is written to ``out[out_pos + k]`` while it fits; the rest
+    are only counted.
+    """
+    path = np.empty(max_len, np.int32)
+    cursor = np.empty(max_len, np.int64)
+    label = comp[start]
+    found = 0
+
+    path[0] = start
+    cursor[0] = indptr[start]
+    depth = 1
+
+    while depth > 0:
+        u = path[depth - 1]
+        i = cursor[depth - 1]
+
+        if i == indptr[u + 1]:
+            depth -= 1
+            continue
+
+        cursor[depth - 1] = i + 1
+        v = indices[i]
+
+        if v == start:
+            if depth >= min_len:
+                row = out_pos + found
+                if row < out.shape[0]:
+                    for k in range(depth):
+                        out[row, k] = path[k]
+                found += 1
+        elif v > start and comp[v] == label and depth < max_len:
+            # Paths are at most max_len long, so a scan beats a visited mask.
+            on_path = False
+            for k in range(1, depth):
+                if path[k] == v:
+                    on_path = True
+                    break
+            if not on_path:
+                path[depth] = v
+                cursor[depth] = indptr[v]
+                depth += 1
+
+    return found
+
+
+@njit(cache=True, nogil=True)
+def _search_block(starts, indptr, indices, comp, min_len, max_len):
+    """Cycles rooted at each of ``starts``, in start order.
+
+    The output buffer doubles on demand; only a start whose cycles did not
+    fit is searched again, so nearly every start is searched once.
+    """
+    out = np.full((16, max_len), -1, np.int32)
+    n_out = 0
+    for t in range(starts.shape[0]):
+        found = _search(starts[t], indptr, indices, comp, min_len, max_len, out, n_out)
+        if n_out + found > out.shape[0]:
+            grown = np.full((max(2 * out.shape[0], n_out + found), max_len), -1, np.int32)
+            grown[:n_out] = out[:n_out]
+            out = grown
+            _search(starts[t], indptr, indices, comp, min_len, max_len, out, n_out)
+        n_out += found
+    return out[:n_out]
+
+
+@njit(cache=True)
+def scc_csr(indptr, indices):
+    """
+    Strongly connected components by iterative Tarjan, O(V + E).
+
+    An explicit call stack replaces recursion, so deep graphs cannot hit
+    the recursion limit. Returns the SCC id of every node.
+    """
+    n = indptr.shape[0] - 1
+    index = np.full(n, -1, np.int32)
+    low = np.zeros(n, np.int32)
+    on_stack = np.zeros(n, np.bool_)
+    stack = np.empty(n, np.int32)
+    call = np.empty(n, np.int32)
+    cursor = np.empty(n, np.int64)
+    comp = np.full(n, -1, np.int32)
+    counter = 0
+    n_comp = 0
+    sp = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+
+        index[root] = low[root] = counter
+        counter += 1
+        stack[sp] = root
+        sp += 1
+        on_stack[root] = True
+        call[0] = root
+        cursor[0] = indptr[root]
+        depth = 1
+
+        while depth > 0:
+            u = call[depth - 1]
+            i = cursor[depth - 1]
+
+            if i < indptr[u + 1]:
+                cursor[depth - 1] = i + 1
+                v = indices[i]
+                if index[v] == -1:
+                    index[v] = low[v] = counter
+                    counter += 1
+                    stack[sp] = v
+                    sp += 1
+                    on_stack[v] = True
+                    call[depth] = v
+                    cursor[depth] = indptr[v]
+                    depth += 1
+                elif on_stack[v]:
+                    low[u] = min(low[u], index[v])
+                continue
+
+            # u is finished: pop its SCC if it is a root, then return to parent
+            if low[u] == index[u]:
+                while True:
+                    sp -= 1
+                    w = stack[sp]
+                    on_stack[w] = False
+                    comp[w] = n_comp
+                    if w == u:
+                        break
+                n_comp += 1
+
+            depth -= 1
+            if depth > 0:
+                parent = call[depth - 1]
+                low[parent] = min(low[parent], low[u])
+
+    return comp
+
+
+@njit(cache=True)
+def cycle_edges(cycles, lengths, indptr, indices, ts_last):
+    """Edge ids and completion time (latest timestamp) of every cycle.
+
+    Edge rows are padded with -1 like ``cycles``; the completion time is
+    MISSING_TS when no edge has a timestamp.
+    """
+    edge_ids = np.full(cycles.shape, -1, np.int64)
+    completed = np.full(cycles.shape[0], MISSING_TS, np.int64)
+
+    for c in range(cycles.shape[0]):
+        L = lengths[c]
+        for k in range(L):
+            u = cycles[c, k]
+            v = cycles[c, (k + 1) % L]
+            e = indptr[u] + np.searchsorted(indices[indptr[u]:indptr[u + 1]], v)
+            edge_ids[c, k] = e
+            completed[c] = max(completed[c], ts_last[e])
+
+    return edge_ids, completed
+
+
+def enumerate_cycles(indptr, indices, comp, min_len, max_len):
+    """All simple cycles with ``min_len <= length <= max_len``.
+
+    ``comp`` holds the SCC label of every node, or -1 for nodes that cannot
+    be on a qualifying cycle. Returns ``(cycles, lengths)`` where row ``k``
+    of ``cycles`` is padded with -1 past ``lengths[k]``.
+    """
+    comp = np.ascontiguousarray(comp, dtype=np.int64)
+    starts = np.flatnonzero(comp >= 0).astype(np.int32)
+    blocks = [starts[i:i + TASK_CHUNK] for i in range(0, len(starts), TASK_CHUNK)]
+    parts = [None] * len(blocks)
+    workers = min(get_num_threads(), len(blocks))
+
+    if workers <= 1:
+        parts = [_search_block(starts, indptr, indices, comp, min_len, max_len)]
+    else:
+        # Threads pull blocks in order from a shared counter; the kernel
+        # releases the GIL, and blocks are joined back in start order.
+        counter = itertools.count()
+
+        def work():
+            for b in iter(counter.__next__, None):
+                if b >= len(blocks):
+                    return
+                parts[b] = _search_block(blocks[b], indptr, indices, comp, min_len, max_len)
+
+        threads = [threading.Thread(target=work) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    cycles = np.concatenate(parts) if parts else np.full((0, max_len), -1, np.int32)
+    lengths = (cycles >= 0).sum(axis=1)
+    return cycles, lengths
@@ -30,12 +30,19 @@ Output format:
 }
 """
 
-import networkx as nx
+import numpy as np
 from collections import defaultdict
-from datetime import datetime
-import statistics
+import importlib.util
+import logging
+import os
 import time
 
+from _crs_kernels import compute_crs_nb
+from _cycle_kernels import cycle_edges, enumerate_cycles, scc_csr
+from ingest import LATEST_TS, MISSING_TS, encode_records, format_ts
+
+logger = logging.getLogger(__name__)
+
 # ==============================
 # CONFIG
 # ==============================
@@ -45,11 +52,19 @@ MAX_CYCLE_LEN = 5
 
 MAX_ALLOWED_DURATION = 7 * 24 * 3600
 
+# Time-ordered passes around a cycle for a full frequency score
+FULL_FREQUENCY_PASSES = 3
+
 HIGH_RISK_THRESHOLD = 0.0
 HIGH_RISK_CYCLE_COUNT = 3
 
 HUB_DEGREE_LIMIT = 20
 
+# SCC backend: "csr" (default, compiled Tarjan), "networkx", "igraph" or
+# "cugraph". igraph and nx-cugraph are optional; a backend that is not
+# installed falls back to "csr" (see resolve_graph_backend).
+GRAPH_BACKEND = os.environ.get("CFD_GRAPH_BACKEND", "csr").strip().lower()
+
 # Balanced CRS weights
 W_LENGTH = 0.25
 W_AMOUNT = 0.20
@@ -59,254 +74,312 @@ W_VOLUME = 0.15
 
 assert abs(W_LENGTH + W_AMOUNT + W_TIME + W_FREQUENCY + W_VOLUME - 1.0) < 1e-9
 
+# Module that must be importable for each SCC backend
+_BACKEND_MODULES = {"csr": None, "networkx": "networkx", "igraph": "igraph", "cugraph": "nx_cugraph"}
 
-# ==============================
-# UTILITIES
-# ==============================
 
-def clamp01(x):
-    return max(0.0, min(1.0, x))
+def resolve_graph_backend(name):
+    """``name`` if it is known and installed, else "csr" with a warning."""
+    if name not in _BACKEND_MODULES:
+        logger.warning("Unknown CFD_GRAPH_BACKEND %r; using csr", name)
+        return "csr"
 
-def safe_float(x):
-    try:
-        return float(x)
-    except:
-        return 0.0
+    module = _BACKEND_MODULES[name]
+    if module is not None and importlib.util.find_spec(module) is None:
+        logger.warning("CFD_GRAPH_BACKEND=%s needs %s, which is not installed; using csr", name, module)
+        return "csr"
 
-def normalize_cycle(cycle):
-    idx = cycle.index(min(cycle))
-    return tuple(cycle[idx:] + cycle[:idx])
+    return name
 
-def parse_ts(ts):
-    if not ts:
-        return None
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%Y-%m-%d"):
-        try:
-            return datetime.strptime(ts.strip(), fmt)
-        except ValueError:
-            continue
-    return None
+
+GRAPH_BACKEND = resolve_graph_backend(GRAPH_BACKEND)
 
 
 # ==============================
-# CRS SCORER
+# GRAPH
 # ==============================
 
-class CRSScorer:
-
-    def __init__(self, graph, edge_meta):
-        self.graph = graph
-        self.edge_meta = edge_meta
 
-    def length_score(self, cycle):
-        L = len(cycle)
-        return clamp01(
-            (MAX_CYCLE_LEN - L + 1) /
-            (MAX_CYCLE_LEN - MIN_CYCLE_LEN + 1)
-        )
+class TransactionGraph:
+    """
+    Directed transaction graph as struct-of-arrays CSR.
+
+    Node ``u`` is account code ``accounts[u]`` (codes ascend with node id,
+    see ingest.encode_accounts). The out-edges of ``u``
+    are edge ids ``indptr[u]:indptr[u + 1]``, sorted by receiver, with
+    ``indices``, ``weight`` and ``total_amount`` as parallel arrays, and
+    ``out_total[u]`` is the summed ``total_amount`` of those edges. The
+    transactions behind edge ``e`` are ``meta_indptr[e]:meta_indptr[e + 1]``
+    in ``meta_amount`` / ``meta_ts`` (epoch seconds, MISSING_TS if unknown,
+    ascending within the edge), summarised per edge by ``ts_first`` / ``ts_last`` / ``ts_count``.
+    """
+
+    def __init__(self, accounts, sender, receiver, amount, ts):
+        n = len(accounts)
+        self.accounts = accounts
+
+        # One sort by (sender, receiver) key, then timestamp, lays the
+        # transactions out edge by edge in CSR order and in time order within
+        # each edge; edges are the runs of equal keys.
+        keys = sender.astype(np.int64) * max(n, 1) + receiver
+        order = np.lexsort((ts, keys))
+        keys = keys[order]
+        self.meta_amount = amount[order]
+        self.meta_ts = ts[order]
+
+        starts = np.flatnonzero(np.diff(keys, prepend=-1))
+        self.meta_indptr = np.append(starts, len(keys)).astype(np.int64)
+
+        pairs = keys[starts]
+        src = (pairs // max(n, 1)).astype(np.int32)
+        self.indices = (pairs % max(n, 1)).astype(np.int32)
+        self.indptr = np.zeros(n + 1, np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+
+        self.weight = np.diff(self.meta_indptr)
+        self.total_amount = np.add.reduceat(self.meta_amount, starts)
+
+        # Outgoing volume per node, shared by every cycle through it
+        self.out_total = np.bincount(src, weights=self.total_amount, minlength=n)
+
+        # Per-edge timestamp summary so cycle scoring never walks transactions:
+        # earliest / latest known timestamp and how many are known.
+        # Every edge has at least one transaction, so no reduceat segment is
+        # empty; MISSING_TS is the int64 minimum and never wins a max.
+        known = self.meta_ts != MISSING_TS
+        self.ts_first = np.minimum.reduceat(np.where(known, self.meta_ts, LATEST_TS), starts)
+        self.ts_last = np.maximum.reduceat(self.meta_ts, starts)
+        self.ts_count = np.add.reduceat(known.astype(np.int64), starts)
+
+    @property
+    def num_nodes(self):
+        return len(self.accounts)
+
+    def sources(self):
+        """Sender id of every edge, aligned with ``indices``."""
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.indptr))
 
-    def amount_similarity_score(self, edges):
-        amounts = []
-        for u, v in edges:
-            data = self.graph[u][v]
-            avg = data["total_amount"] / data["weight"]
-            amounts.append(avg)
 
-        if not amounts:
-            return 0.0
+# ==============================
+# CRS SCORER
+# ==============================
 
-        mean = sum(amounts) / len(amounts)
-        if mean == 0:
-            return 0.0
+class CRSScorer:
+    """Thin wrapper around the compiled CRS kernels in _crs_kernels."""
 
-        if len(amounts) == 1:
-            return 1.0
+    WEIGHTS = np.array([W_LENGTH, W_AMOUNT, W_TIME, W_FREQUENCY, W_VOLUME])
 
-        std = statistics.stdev(amounts)
-        return clamp01(1 - std / mean)
+    def __init__(self, graph):
+        self.graph = graph
 
-    def time_score(self, edges):
-        timestamps = []
-        for u, v in edges:
-            for meta in self.edge_meta[(u, v)]:
-                if meta["timestamp"]:
-                    timestamps.append(meta["timestamp"])
+    def compute(self, cycle, edges):
+        g = self.graph
+        raw = compute_crs_nb(
+            cycle,
+            edges,
+            g.weight, g.total_amount,
+            g.ts_first, g.ts_last, g.ts_count, g.meta_indptr, g.meta_ts, g.out_total, self.WEIGHTS,
+            MIN_CYCLE_LEN, MAX_CYCLE_LEN, MAX_ALLOWED_DURATION, FULL_FREQUENCY_PASSES,
+        )
 
-        if len(timestamps) < 2:
-            return 0.5
+        return round(raw * 100, 2)
 
-        duration = (max(timestamps) - min(timestamps)).total_seconds()
-        return clamp01(1 - duration / MAX_ALLOWED_DURATION)
 
-    def frequency_score(self, cycle, cycle_occurrences):
-        count = len(cycle_occurrences.get(normalize_cycle(cycle), []))
-        return clamp01(min(count / 3.0, 1.0))
+# ==============================
+# DETECTOR
+# ==============================
 
-    def volume_score(self, cycle, edges):
-        cycle_volume = sum(self.graph[u][v]["total_amount"] for u, v in edges)
+class CircularFundRoutingDetector:
 
-        total_outgoing = 0
-        for u in cycle:
-            for _, v in self.graph.out_edges(u):
-                total_outgoing += self.graph[u][v]["total_amount"]
+    def __init__(self):
+        self.graph = None
+
+    def build_graph(self, sender, receiver, amount, ts):
+        valid = (sender >= 0) & (receiver >= 0) & (sender != receiver)
+        s, r = sender[valid], receiver[valid]
+
+        # Compact the codes of accounts that have edges into node ids; both
+        # are ascending, so node id order still matches account order.
+        accounts, local = np.unique(np.concatenate([s, r]), return_inverse=True)
+        local = local.astype(np.int32)
+
+        self.graph = TransactionGraph(
+            accounts,
+            local[:len(s)],
+            local[len(s):],
+            amount[valid],
+            ts[valid],
+        )
 
-        if total_outgoing == 0:
-            return 0.0
+    def prune(self):
+        """
+        Hub- and leaf-free subgraph as its own CSR.
 
-        return clamp01(cycle_volume / total_outgoing)
+        Returns ``(kept, indptr, indices)``: pruned node ``i`` is graph node
+        ``kept[i]``. Relabelling is monotone, so rows stay sorted and the
+        smallest id of a cycle is the same in both graphs.
+        """
+        g = self.graph
+        n = g.num_nodes
+        src, dst = g.sources(), g.indices
 
-    def compute(self, cycle, cycle_occurrences):
-        edges = list(zip(cycle, cycle[1:] + [cycle[0]]))
+        degree = np.diff(g.indptr) + np.bincount(dst, minlength=n)
+        threshold = max(HUB_DEGREE_LIMIT, int(0.1 * n))
+        keep = degree <= threshold
 
-        raw = (
-            W_LENGTH * self.length_score(cycle) +
-            W_AMOUNT * self.amount_similarity_score(edges) +
-            W_TIME * self.time_score(edges) +
-            W_FREQUENCY * self.frequency_score(cycle, cycle_occurrences) +
-            W_VOLUME * self.volume_score(cycle, edges)
-        )
+        alive = keep[src] & keep[dst]
+        has_out = np.bincount(src[alive], minlength=n) > 0
+        has_in = np.bincount(dst[alive], minlength=n) > 0
+        keep &= has_in & has_out
 
-        return round(clamp01(raw) * 100, 2)
+        alive = keep[src] & keep[dst]
+        kept = np.flatnonzero(keep)
+        new_id = np.cumsum(keep) - 1
 
+        indptr = np.zeros(len(kept) + 1, np.int64)
+        np.cumsum(np.bincount(new_id[src[alive]], minlength=len(kept)), out=indptr[1:])
+        indices = new_id[dst[alive]].astype(np.int32)
 
-# ==============================
-# DETECTOR
-# ==============================
+        return kept, indptr, indices
 
-class CircularFundRoutingDetector:
+    def detect_cycles(self):
+        """
+        Enumerate cycles and everything scoring needs in one pass.
 
-    def __init__(self):
-        self.graph = nx.DiGraph()
-        self.edge_meta = defaultdict(list)
+        Returns a list of ``(cycle, edges, max_ts)`` tuples: node ids already
+        in normal form (starting at the smallest id), the edge ids, and the
+        latest transaction timestamp on the cycle.
+        """
+        g = self.graph
+        kept, indptr, indices = self.prune()
 
-    def build_graph(self, transactions):
-        for txn in transactions:
-            s = txn.get("sender_id", "")
-            r = txn.get("receiver_id", "")
+        comp = self.strong_components(indptr, indices)
+        if not (comp >= 0).any():
+            return []
 
-            if not s or not r or s == r:
-                continue
+        found, lengths = enumerate_cycles(indptr, indices, comp, MIN_CYCLE_LEN, MAX_CYCLE_LEN)
+        found = np.where(found >= 0, kept[np.maximum(found, 0)], -1).astype(np.int32)
+        edge_ids, completed = cycle_edges(found, lengths, g.indptr, g.indices, g.ts_last)
 
-            amt = safe_float(txn.get("amount", 0))
-            ts = parse_ts(txn.get("timestamp", ""))
+        cycles = []
 
-            if self.graph.has_edge(s, r):
-                self.graph[s][r]["weight"] += 1
-                self.graph[s][r]["total_amount"] += amt
-            else:
-                self.graph.add_edge(s, r, weight=1, total_amount=amt)
+        for row, edges, L, max_ts in zip(found, edge_ids, lengths.tolist(), completed.tolist()):
+            cycles.append((row[:L], edges[:L], max_ts))
 
-            self.edge_meta[(s, r)].append({
-                "amount": amt,
-                "timestamp": ts
-            })
+        return cycles
 
-    def prune(self):
-        G = self.graph.copy()
+    def strong_components(self, indptr, indices):
+        """SCC label per node id; -1 where the SCC is too small for a cycle."""
+        labels = self.scc_labels(indptr, indices)
 
-        threshold = max(HUB_DEGREE_LIMIT, int(0.1 * G.number_of_nodes()))
-        hubs = [n for n in G if G.degree(n) > threshold]
-        G.remove_nodes_from(hubs)
+        # Sparse graphs are mostly singleton SCCs; only components that can
+        # hold a cycle keep their label, and nothing is built per component.
+        sizes = np.bincount(labels)
+        big = np.flatnonzero(sizes >= MIN_CYCLE_LEN)
+        keep = np.full(sizes.shape[0], -1, np.int64)
+        keep[big] = big
 
-        leaves = [n for n in G if G.in_degree(n) == 0 or G.out_degree(n) == 0]
-        G.remove_nodes_from(leaves)
+        return keep[labels]
 
-        return G
+    def scc_labels(self, indptr, indices):
+        """Raw SCC id of every node from the configured backend."""
+        if GRAPH_BACKEND == "csr":
+            return scc_csr(indptr, indices).astype(np.int64)
 
-    def detect_cycles(self):
-        G = self.prune()
-        cycles = []
-        seen = set()
+        n = len(indptr) - 1
+        src = np.repeat(np.arange(n), np.diff(indptr))
 
-        for scc in nx.strongly_connected_components(G):
-            if len(scc) < MIN_CYCLE_LEN:
-                continue
+        if GRAPH_BACKEND == "igraph":
+            import igraph as ig
 
-            sub = G.subgraph(scc).copy()
+            g = ig.Graph(n=n, edges=np.column_stack((src, indices)).tolist(), directed=True)
+            return np.asarray(g.connected_components(mode="strong").membership, np.int64)
 
-            for cycle in nx.simple_cycles(sub, length_bound=MAX_CYCLE_LEN):
-                if MIN_CYCLE_LEN <= len(cycle) <= MAX_CYCLE_LEN:
-                    norm = normalize_cycle(cycle)
-                    if norm not in seen:
-                        seen.add(norm)
-                        cycles.append(list(norm))
+        import networkx as nx
 
-        return cycles
+        G = nx.DiGraph()
+        G.add_nodes_from(range(n))
+        G.add_edges_from(zip(src.tolist(), indices.tolist()))
+        if GRAPH_BACKEND == "cugraph":
+            sccs = nx.strongly_connected_components(G, backend="cugraph")
+        else:
+            sccs = nx.strongly_connected_components(G)
 
-    def get_cycle_completion_time(self, cycle):
-        timestamps = []
-        edges = list(zip(cycle, cycle[1:] + [cycle[0]]))
+        labels = np.empty(n, np.int64)
+        for label, members in enumerate(sccs):
+            labels[list(members)] = label
 
-        for u, v in edges:
-            for meta in self.edge_meta.get((u, v), []):
-                if meta["timestamp"]:
-                    timestamps.append(meta["timestamp"])
+        return labels
 
-        if not timestamps:
-            return None
+    def run(self, transactions):
+        """Compatibility entry point for a list of transaction dicts."""
+        return self.run_arrays(*encode_records(transactions))
 
-        return max(timestamps)
+    def run_arrays(self, sender, receiver, amount, ts, id_map):
+        """
+        Detect cycles in pre-parsed transactions (see ingest.encode_transactions).
 
-    def run(self, transactions):
+        sender / receiver are int32 codes into id_map, amount is float64 and
+        ts is int64 epoch seconds.
+        """
         start = time.time()
-        self.build_graph(transactions)
+        self.build_graph(sender, receiver, amount, ts)
         cycles = self.detect_cycles()
 
-        cycle_occurrences = defaultdict(list)
-        for cycle in cycles:
-            cycle_occurrences[normalize_cycle(cycle)].append(datetime.now())
-
-        scorer = CRSScorer(self.graph, self.edge_meta)
+        scorer = CRSScorer(self.graph)
 
         rings = []
         account_data = defaultdict(list)
 
-        for idx, cycle in enumerate(cycles, start=1):
-            score = scorer.compute(cycle, cycle_occurrences)
+        for idx, (cycle, edges, max_ts) in enumerate(cycles, start=1):
+            score = scorer.compute(cycle, edges)
             ring_id = f"RING_{idx:03d}"
-
-            completion_time = self.get_cycle_completion_time(cycle)
+            members = self.graph.accounts[cycle].tolist()
+            cycle_length = len(members)
 
             rings.append({
                 "ring_id": ring_id,
-                "member_accounts": cycle,
+                "member_accounts": [id_map[acc] for acc in members],
                 "pattern_type": "cycle",
                 "risk_score": score,
-                "detected_at": completion_time.strftime("%Y-%m-%d %H:%M:%S")
-                               if completion_time else None
+                "detected_at": format_ts(max_ts)
             })
 
-            for acc in cycle:
+            for acc in members:
                 account_data[acc].append({
                     "score": score,
                     "ring_id": ring_id,
-                    "cycle_length": len(cycle)
+                    "cycle_length": cycle_length
                 })
 
         suspicious_accounts = []
 
         for acc, entries in account_data.items():
-            max_score = max(e["score"] for e in entries)
-            high_risk_cycles = sum(1 for e in entries if e["score"] > HIGH_RISK_THRESHOLD)
+            max_score = entries[0]["score"]
+            has_len3 = has_high_vel = False
 
+            for e in entries:
+                max_score = max(max_score, e["score"])
+                has_len3 = has_len3 or e["cycle_length"] == 3
+                has_high_vel = has_high_vel or e["score"] > 85
+
+            # The cycle count only matters when no single cycle flags the account
             flagged = (
                 max_score > HIGH_RISK_THRESHOLD or
-                high_risk_cycles > HIGH_RISK_CYCLE_COUNT
+                sum(1 for e in entries if e["score"] > HIGH_RISK_THRESHOLD) > HIGH_RISK_CYCLE_COUNT
             )
 
             if flagged:
-                patterns = set()
-
-                for e in entries:
-                    if e["cycle_length"] == 3:
-                        patterns.add("cycle_length_3")
-                    if e["score"] > 85:
-                        patterns.add("high_velocity")
+                patterns = []
+                if has_len3:
+                    patterns.append("cycle_length_3")
+                if has_high_vel:
+                    patterns.append("high_velocity")
 
                 suspicious_accounts.append({
-                    "account_id": acc,
+                    "account_id": id_map[acc],
                     "suspicion_score": round(max_score, 2),
-                    "detected_patterns": sorted(patterns),
+                    "detected_patterns": patterns,
                     "ring_id": entries[0]["ring_id"]
                 })
 
@@ -314,7 +387,7 @@ class CircularFundRoutingDetector:
             "suspicious_accounts": suspicious_accounts,
             "fraud_rings": rings,
             "summary": {
-                "total_accounts_analyzed": self.graph.number_of_nodes(),
+                "total_accounts_analyzed": self.graph.num_nodes,
                 "suspicious_accounts_flagged": len(suspicious_accounts),
                 "fraud_rings_detected": len(rings),
                 "processing_time_seconds": round(time.time() - start, 3)
@@ -0,0 +1,91 @@
+"""
+Transaction Ingest
+==================
+
+Turns an uploaded transactions table into the flat arrays the detectors
+consume, parsing every column once with pandas instead of per row:
+
+sender, receiver : int32 account codes into ``id_map`` (-1 if missing)
+amount           : float64 (0.0 if not numeric)
+ts               : int64 epoch seconds (MISSING_TS if unparseable)
+
+Account codes share one sorted code space, so code order matches account
+id order.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+MISSING_TS = np.iinfo(np.int64).min
+# Neutral value for a running minimum of timestamps (never wins a min)
+LATEST_TS = np.iinfo(np.int64).max
+
+TIMESTAMP_FORMATS = ("%Y-%m-%d %H:%M:%S", "%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%Y-%m-%d")
+
+_EPOCH = pd.Timestamp(1970, 1, 1)
+
+
+def encode_accounts(senders, receivers):
+    """Intern sender/receiver ids into shared int32 codes.
+
+    Returns ``(sender_codes, receiver_codes, id_map)``; empty or missing
+    ids get code -1.
+    """
+    senders = pd.Series(senders, dtype=object).replace("", None)
+    receivers = pd.Series(receivers, dtype=object).replace("", None)
+
+    cat = pd.Categorical(pd.concat([senders, receivers], ignore_index=True))
+    codes = cat.codes.astype(np.int32)
+    n = len(senders)
+
+    return codes[:n], codes[n:], cat.categories.tolist()
+
+
+def parse_amounts(values):
+    return pd.to_numeric(pd.Series(values), errors="coerce").fillna(0.0).to_numpy(np.float64)
+
+
+def parse_timestamps(values):
+    """Epoch seconds for each value, trying TIMESTAMP_FORMATS in order."""
+    text = pd.Series(values, dtype="string").str.strip()
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[s]")
+
+    for fmt in TIMESTAMP_FORMATS:
+        missing = parsed.isna() & text.notna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+
+    seconds = (parsed - _EPOCH) // pd.Timedelta(seconds=1)
+    return seconds.fillna(MISSING_TS).to_numpy(np.int64)
+
+
+def encode_transactions(df):
+    """``(sender, receiver, amount, ts, id_map)`` for a transactions frame."""
+    sender, receiver, id_map = encode_accounts(df["sender_id"], df["receiver_id"])
+    return (
+        sender,
+        receiver,
+        parse_amounts(df["amount"]),
+        parse_timestamps(df["timestamp"]),
+        id_map,
+    )
+
+
+def encode_records(transactions):
+    """``encode_transactions`` for a list of transaction dicts."""
+    df = pd.DataFrame.from_records(
+        transactions, columns=["sender_id", "receiver_id", "amount", "timestamp"]
+    )
+    return encode_transactions(df)
+
+
+def format_ts(seconds):
+    """Render epoch seconds the way detectors report ``detected_at``."""
+    if seconds == MISSING_TS:
+        return None
+    # datetime covers the full year 1-9999 range that parse_timestamps accepts;
+    # pandas Timedeltas stop around 1677-2262.
+    return (datetime(1970, 1, 1) + timedelta(seconds=int(seconds))).strftime("%Y-%m-%d %H:%M:%S")
@@ -2,7 +2,12 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import pandas as pd
 import io
+import multiprocessing
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from ingest import encode_transactions
 from circular_fund_detector import CircularFundRoutingDetector
 from smurfing_detector import SmurfingDetector
 from shell_detector import ShellNetworkDetector
@@ -10,6 +15,62 @@ from shell_detector import ShellNetworkDetector
 app = Flask(__name__)
 CORS(app)
 
+# Detector workers, started on first use and reused so compiled kernels stay warm.
+# "spawn" avoids forking a threaded server process.
+# A pool whose worker died is broken for good, so it is dropped and rebuilt.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=3, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def discard_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_circular(sender, receiver, amount, ts, id_map):
+    return CircularFundRoutingDetector().run_arrays(sender, receiver, amount, ts, id_map)
+
+
+def _run_smurf(sender, receiver, amount, ts, id_map):
+    return SmurfingDetector().run_arrays(sender, receiver, amount, ts, id_map)
+
+
+def _run_shell(sender, receiver, id_map):
+    return ShellNetworkDetector().run_arrays(sender, receiver, id_map)
+
+
+def run_detectors(sender, receiver, amount, ts, id_map):
+    """
+    Run the three independent detectors concurrently in the worker pool.
+
+    If a worker dies mid-request the run is retried once on a fresh pool;
+    a second failure fails only this request.
+    """
+    for attempt in range(2):
+        executor = get_executor()
+        try:
+            futures = (
+                executor.submit(_run_circular, sender, receiver, amount, ts, id_map),
+                executor.submit(_run_smurf, sender, receiver, amount, ts, id_map),
+                executor.submit(_run_shell, sender, receiver, id_map),
+            )
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            discard_executor(executor)
+            if attempt:
+                raise
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
     start_time = time.time()
@@ -32,23 +93,12 @@ def analyze():
         if not required_cols.issubset(df.columns):
              return jsonify({"error": f"Missing required columns. Found: {list(df.columns)}"}), 400
 
-        # Convert to list of dicts for detectors
-        transactions = df.to_dict(orient='records')
+        # Parse columns once into flat arrays shared by all detectors
+        sender, receiver, amount, ts, id_map = encode_transactions(df)
         
-        # Run Detectors
+        # Run Detectors: circular fund routing, smurfing, shell networks
         logging_info = {}
-        
-        # 1. Circular Fund Routing
-        circular_detector = CircularFundRoutingDetector()
-        circular_results = circular_detector.run(transactions)
-        
-        # 2. Smurfing
-        smurfing_detector = SmurfingDetector()
-        smurfing_results = smurfing_detector.run(transactions)
-        
-        # 3. Shell Networks
-        shell_detector = ShellNetworkDetector()
-        shell_results = shell_detector.run(transactions)
+        circular_results, smurfing_results, shell_results = run_detectors(sender, receiver, amount, ts, id_map)
 
         # Aggregate Results
         suspicious_accounts = []
@@ -100,7 +150,7 @@ def analyze():
             "suspicious_accounts": suspicious_accounts,
             "fraud_rings": fraud_rings,
             "summary": {
-                "total_accounts_analyzed": len(set(df['sender_id']).union(set(df['receiver_id']))),
+                "total_accounts_analyzed": len(id_map),
                 "suspicious_accounts_flagged": len(suspicious_accounts),
                 "fraud_rings_detected": len(fraud_rings),
                 "processing_time_seconds": processing_time
@@ -3,145 +3,262 @@ Shell Network Detector
 ======================
 
 Detects:
-Layered Shell Networks: Money passes through intermediate "shell" accounts 
+Layered Shell Networks: Money passes through intermediate "shell" accounts
 with low transaction counts before reaching the final destination.
 
 Look for chains of 3+ hops where intermediate accounts have only 2–3 total transactions.
 This implies we need to find paths A -> B -> C -> D where B and C are "shells".
+
+Algorithm:
+1. Shells are accounts with 2-3 transactions (in + out).
+2. A chain is a simple path of shells from a shell with a non-shell
+   predecessor to a shell with a non-shell successor.
+3. Report the longest chain of every weakly connected shell component if it
+   has 2+ shells: a topological DP (linear time) for acyclic components, a
+   depth-bounded DFS for components containing a shell-to-shell cycle.
 """
 
-import networkx as nx
+import numpy as np
+from numba import njit
 
-class ShellNetworkDetector:
+from ingest import encode_accounts
+
+# ==============================
+# CONFIG
+# ==============================
+
+SHELL_MIN_TXNS = 2
+SHELL_MAX_TXNS = 3
+MIN_CHAIN_SHELLS = 2
+# Path length cap for components that contain a shell-to-shell cycle
+MAX_CHAIN_SEARCH_DEPTH = 32
+
+
+@njit(cache=True)
+def _find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+@njit(cache=True)
+def shell_chains(n, src, dst, is_shell, min_shells, max_search_depth):
+    """
+    Longest shell chain of every weakly connected shell component.
+
+    A chain is a simple path of shells that starts at a shell with a
+    non-shell predecessor and ends at a shell with a non-shell successor.
+    ``src`` / ``dst`` are the unique, non-self-loop edges of the full graph.
+    Returns ``(chain_nodes, chain_ptr)``: chain ``k`` is
+    ``chain_nodes[chain_ptr[k]:chain_ptr[k + 1]]``, in component order.
+    """
+    indeg_full = np.bincount(dst, minlength=n)
+    outdeg_full = np.bincount(src, minlength=n)
+
+    mask = is_shell[src] & is_shell[dst]
+    ss, sd = src[mask], dst[mask]
+    indeg_shell = np.bincount(sd, minlength=n)
+    outdeg_shell = np.bincount(ss, minlength=n)
+
+    is_entry = is_shell & (indeg_full > indeg_shell)
+    is_exit = is_shell & (outdeg_full > outdeg_shell)
+
+    # CSR of the shell subgraph
+    order = np.argsort(ss, kind="mergesort")
+    succ = sd[order]
+    indptr = np.zeros(n + 1, np.int64)
+    indptr[1:] = np.cumsum(outdeg_shell)
+
+    # Weakly connected components (union-find); the root is the smallest id
+    parent = np.arange(n)
+    for k in range(ss.shape[0]):
+        a, b = _find(parent, ss[k]), _find(parent, sd[k])
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    # Kahn's algorithm: shells never dequeued lie on or behind a shell cycle
+    remaining = indeg_shell.copy()
+    queue = np.empty(n, np.int64)
+    head, tail = 0, 0
+    for v in range(n):
+        if is_shell[v] and remaining[v] == 0:
+            queue[tail] = v
+            tail += 1
+
+    while head < tail:
+        u = queue[head]
+        head += 1
+        for i in range(indptr[u], indptr[u + 1]):
+            v = succ[i]
+            remaining[v] -= 1
+            if remaining[v] == 0:
+                queue[tail] = v
+                tail += 1
+
+    cyclic = np.zeros(n, np.bool_)
+    for v in range(n):
+        if is_shell[v] and remaining[v] > 0:
+            cyclic[_find(parent, v)] = True
+
+    # Acyclic components: reach[v] is the node count of the longest path
+    # from v to an exit shell (0 if none), filled in reverse topological order.
+    reach = np.zeros(n, np.int64)
+    nxt = np.full(n, -1, np.int64)
+    for k in range(tail - 1, -1, -1):
+        v = queue[k]
+        r = 1 if is_exit[v] else 0
+        for i in range(indptr[v], indptr[v + 1]):
+            w = succ[i]
+            if reach[w] > 0 and reach[w] + 1 > r:
+                r = reach[w] + 1
+                nxt[v] = w
+        reach[v] = r
+
+    # Shells grouped by component root, ascending within each group
+    roots = np.full(n, -1, np.int64)
+    group_ptr = np.zeros(n + 1, np.int64)
+    for v in range(n):
+        if is_shell[v]:
+            roots[v] = _find(parent, v)
+            group_ptr[roots[v] + 1] += 1
+    group_ptr = np.cumsum(group_ptr)
+    members = np.empty(group_ptr[n], np.int64)
+    fill = group_ptr[:n].copy()
+    for v in range(n):
+        if roots[v] >= 0:
+            members[fill[roots[v]]] = v
+            fill[roots[v]] += 1
+
+    chain_nodes = np.empty(n, np.int64)
+    chain_ptr = np.zeros(n + 1, np.int64)
+    best = np.empty(n, np.int64)
+    path = np.empty(max_search_depth, np.int64)
+    cursor = np.empty(max_search_depth, np.int64)
+    n_chains = 0
+    pos = 0
+
+    for root in range(n):
+        lo, hi = group_ptr[root], group_ptr[root + 1]
+        if hi - lo < min_shells:
+            continue
 
-    def __init__(self):
-        self.graph = nx.DiGraph()
+        best_len = 0
+
+        if not cyclic[root]:
+            start = -1
+            for k in range(lo, hi):
+                v = members[k]
+                if is_entry[v] and reach[v] > best_len:
+                    best_len = reach[v]
+                    start = v
+            v = start
+            for k in range(best_len):
+                best[k] = v
+                v = nxt[v]
+        else:
+            # Shell cycles: depth-bounded DFS over simple paths from every entry
+            for k in range(lo, hi):
+                s = members[k]
+                if not is_entry[s]:
+                    continue
+
+                path[0] = s
+                cursor[0] = indptr[s]
+                depth = 1
+                if is_exit[s] and best_len < 1:
+                    best_len = 1
+                    best[0] = s
+
+                while depth > 0:
+                    u = path[depth - 1]
+                    i = cursor[depth - 1]
+                    if i == indptr[u + 1] or depth == max_search_depth:
+                        depth -= 1
+                        continue
+
+                    cursor[depth - 1] = i + 1
+                    v = succ[i]
+                    on_path = False
+                    for j in range(depth):
+                        if path[j] == v:
+                            on_path = True
+                            break
+                    if on_path:
+                        continue
+
+                    path[depth] = v
+                    cursor[depth] = indptr[v]
+                    depth += 1
+                    if is_exit[v] and depth > best_len:
+                        best_len = depth
+                        best[:depth] = path[:depth]
+
+        if best_len < min_shells:
+            continue
+
+        chain_nodes[pos:pos + best_len] = best[:best_len]
+        pos += best_len
+        n_chains += 1
+        chain_ptr[n_chains] = pos
+
+    return chain_nodes[:pos], chain_ptr[:n_chains + 1]
+
+
+class ShellNetworkDetector:
 
     def run(self, transactions):
-        self.graph.clear()
-        
-        # 1. Build Graph and Count Transactions per Node
-        node_txn_counts = {} # Total transactions (in + out) for each node
-
-        for txn in transactions:
-            s = txn.get("sender_id")
-            r = txn.get("receiver_id")
-            
-            if s and r:
-                self.graph.add_edge(s, r)
-                
-                node_txn_counts[s] = node_txn_counts.get(s, 0) + 1
-                node_txn_counts[r] = node_txn_counts.get(r, 0) + 1
+        """Compatibility entry point for a list of transaction dicts."""
+        sender, receiver, id_map = encode_accounts(
+            [txn.get("sender_id") for txn in transactions],
+            [txn.get("receiver_id") for txn in transactions],
+        )
+        return self.run_arrays(sender, receiver, id_map)
+
+    def run_arrays(self, sender, receiver, id_map):
+        """Detect shell chains from int32 account codes (see ingest.encode_transactions)."""
+        n = len(id_map)
+        valid = (sender >= 0) & (receiver >= 0)
+        sender, receiver = sender[valid], receiver[valid]
+
+        # 1. Count transactions per account (in + out)
+        txn_counts = np.bincount(sender, minlength=n) + np.bincount(receiver, minlength=n)
+        is_shell = (txn_counts >= SHELL_MIN_TXNS) & (txn_counts <= SHELL_MAX_TXNS)
+
+        if not is_shell.any():
+            return {"suspicious_accounts": [], "fraud_rings": []}
+
+        # 2. Unique directed edges; self-transfers are not hops
+        hop = sender != receiver
+        pairs = np.unique(sender[hop].astype(np.int64) * n + receiver[hop])
+        src, dst = pairs // n, pairs % n
+
+        # 3. Shell chains
+        chain_nodes, chain_ptr = shell_chains(n, src, dst, is_shell, MIN_CHAIN_SHELLS, MAX_CHAIN_SEARCH_DEPTH)
 
         suspicious_accounts = []
         rings = []
-        
-        # 2. Identify Potential Shell Accounts (2-3 total transactions)
-        shells = {node for node, count in node_txn_counts.items() if 2 <= count <= 3}
-        
-        if not shells:
-            return {"suspicious_accounts": [], "fraud_rings": []}
 
-        # 3. Find paths through shells
-        # We are looking for chains of 3+ hops. A -> Shell -> Shell -> D
-        # This is essentially finding paths in the subgraph induced by shells + their neighbors,
-        # but specifically satisfying the shell property for intermediates.
-        
-        # Optimization: Iterate over all nodes, if a node is a shell, check its neighbors.
-        # Better: Standard DFS/BFS limited to depth, but tracking shell status.
-        
-        # Let's simplify: Find connected components of shell nodes.
-        # If a connected component of shell nodes has size >= 2 (Shell -> Shell), 
-        # and is connected to non-shells at ends, it's a layered network.
-        
-        shell_subgraph = self.graph.subgraph(shells).copy()
-        
-        # We need chains of shells.
-        # A simple approach: 
-        # Iterate over all edges (u, v) in shell_subgraph.
-        # If we find a path in shell_subgraph of length >= 1 (which creates a 3-hop chain with endpoints: S -> u -> v -> D)
-        
-        # Let's look for simple paths in the full graph where intermediate nodes are ALL in `shells` set.
-        # And length of path >= 3 (3 hops means 2 intermediate nodes).
-        
-        detected_shells = set()
-        
-        # Iterate through all shell nodes to find if they are part of a chain
-        for node in shells:
-            if node in detected_shells:
-                continue
-                
-            # Check for incoming from shell and outgoing to shell
-            # This is expensive to do exhaustively.
-            pass
-
-        # Alternative Approach:
-        # 1. remove non-shell nodes, but keep edges between shells.
-        # 2. find connected components of shells.
-        # 3. For each component, check if it forms a path/chain.
-        
-        for component in nx.weakly_connected_components(shell_subgraph):
-            if len(component) >= 2:
-                # Potential shell chain
-                comp_sub = shell_subgraph.subgraph(component)
-                
-                # Check if it looks link-like (nodes have low degree within component)
-                # If it's a chain: A -> B -> C
-                
-                # We need to verify these attach to something outside.
-                # Nodes in `component` are the candidate shells.
-                
-                # Trace valid paths: In -> Shell1 -> Shell2 -> ... -> Out
-                start_nodes = [n for n in component if self.graph.in_degree(n) > 0]
-                
-                valid_chain = False
-                chain_members = []
-                
-                for start in start_nodes:
-                    # Do a DFS from start, constrained to 'component' nodes
-                    # We want a path of length at least 1 inside the component (2 shells)
-                    # leading to non-shell outputs.
-                    
-                    # DFS to find longest path in this shell component
-                    paths = nx.all_simple_paths(comp_sub, source=start, target=[n for n in component])
-                    
-                    for path in paths:
-                        if len(path) >= 2: # At least 2 shells involved: S1 -> S2
-                            # Check if S1 has a predecessor that is NOT a shell (or even if it is, we just need a source)
-                            # Check if the last node has a successor.
-                            
-                            first = path[0]
-                            last = path[-1]
-                            
-                            has_input = self.graph.in_degree(first) > 0 # Any input
-                            has_output = self.graph.out_degree(last) > 0 # Any output
-                            
-                            if has_input and has_output:
-                                valid_chain = True
-                                chain_members = path
-                                break
-                    if valid_chain:
-                        break
-                
-                if valid_chain:
-                    ring_id = f"SHELL_{chain_members[0]}"
-                    rings.append({
-                        "ring_id": ring_id,
-                        "member_accounts": chain_members,
-                        "pattern_type": "shell_network",
-                        "risk_score": 75.0,
-                        "detected_at": None # No specific time for structural pattern
-                    })
-                    
-                    for member in chain_members:
-                        if member not in detected_shells:
-                            detected_shells.add(member)
-                            suspicious_accounts.append({
-                                "account_id": member,
-                                "suspicion_score": 75.0,
-                                "detected_patterns": ["shell_account"],
-                                "ring_id": ring_id
-                            })
+        for k in range(len(chain_ptr) - 1):
+            chain_members = [id_map[i] for i in chain_nodes[chain_ptr[k]:chain_ptr[k + 1]].tolist()]
+            ring_id = f"SHELL_{chain_members[0]}"
+
+            rings.append({
+                "ring_id": ring_id,
+                "member_accounts": chain_members,
+                "pattern_type": "shell_network",
+                "risk_score": 75.0,
+                "detected_at": None # No specific time for structural pattern
+            })
+
+            # Components are disjoint, so every member is reported once
+            for member in chain_members:
+                suspicious_accounts.append({
+                    "account_id": member,
+                    "suspicion_score": 75.0,
+                    "detected_patterns": ["shell_account"],
+                    "ring_id": ring_id
+                })
 
         return {
             "suspicious_accounts": suspicious_accounts,
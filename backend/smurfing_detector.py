@@ -9,8 +9,10 @@ Detects:
 
 """
 
-from collections import defaultdict
-from datetime import datetime, timedelta
+import numpy as np
+from numba import njit
+
+from ingest import MISSING_TS, encode_records, format_ts
 
 # ==============================
 # CONFIG
@@ -19,113 +21,135 @@ from datetime import datetime, timedelta
 FAN_IN_THRESHOLD = 10
 FAN_OUT_THRESHOLD = 10
 TIME_WINDOW_HOURS = 72
+TIME_WINDOW_SECONDS = TIME_WINDOW_HOURS * 3600
 
-class SmurfingDetector:
 
-    def __init__(self):
-        self.fan_in = defaultdict(list)
-        self.fan_out = defaultdict(list)
+@njit(cache=True)
+def first_dense_window(group_ptr, peers, ts, n_accounts, window, threshold):
+    """
+    Sliding-window sweep over transactions grouped by account.
 
-    def parse_ts(self, ts):
-        if not ts:
-            return None
-        for fmt in ("%Y-%m-%d %H:%M:%S", "%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%Y-%m-%d"):
-            try:
-                return datetime.strptime(ts.strip(), fmt)
-            except ValueError:
-                continue
-        return None
+    Within each group (sorted by ts) a two-pointer window keeps per-peer
+    counts, so the number of distinct peers is updated in O(1) per step.
+    Returns, per group, the ``(left, right)`` indices of the first window
+    holding ``threshold`` distinct peers, or -1 if there is none.
+    """
+    n_groups = group_ptr.shape[0] - 1
+    lefts = np.full(n_groups, -1, np.int64)
+    rights = np.full(n_groups, -1, np.int64)
+    counts = np.zeros(n_accounts, np.int32)
 
-    def run(self, transactions):
-        self.fan_in.clear()
-        self.fan_out.clear()
+    for g in range(n_groups):
+        lo, hi = group_ptr[g], group_ptr[g + 1]
+        if hi - lo < threshold:
+            continue
+
+        start = lo
+        distinct = 0
+        i = lo
+        while i < hi:
+            p = peers[i]
+            if counts[p] == 0:
+                distinct += 1
+            counts[p] += 1
+
+            while start < i and ts[i] - ts[start] > window:
+                q = peers[start]
+                counts[q] -= 1
+                if counts[q] == 0:
+                    distinct -= 1
+                start += 1
+
+            if distinct >= threshold:
+                lefts[g] = start
+                rights[g] = i
+                break
+            i += 1
 
-        # Group transactions by receiver (fan-in) and sender (fan-out)
-        for txn in transactions:
-            s = txn.get("sender_id")
-            r = txn.get("receiver_id")
-            ts = self.parse_ts(txn.get("timestamp"))
-            amount = float(txn.get("amount", 0))
+        # Reset only what this group touched.
+        for j in range(start, min(i + 1, hi)):
+            counts[peers[j]] = 0
 
-            if s and r and ts:
-                self.fan_in[r].append({"sender": s, "ts": ts, "amount": amount})
-                self.fan_out[s].append({"receiver": r, "ts": ts, "amount": amount})
+    return lefts, rights
+
+
+class SmurfingDetector:
+
+    def run(self, transactions):
+        """Compatibility entry point for a list of transaction dicts."""
+        return self.run_arrays(*encode_records(transactions))
+
+    def run_arrays(self, sender, receiver, amount, ts, id_map):
+        """Detect smurfing in pre-parsed transactions (see ingest.encode_transactions)."""
+        valid = (sender >= 0) & (receiver >= 0) & (ts != MISSING_TS)
+        sender, receiver, ts = sender[valid], receiver[valid], ts[valid]
 
         suspicious_accounts = []
         rings = []
 
-        # Detect Fan-in
-        for acc, txns in self.fan_in.items():
-            # Sort by timestamp
-            txns.sort(key=lambda x: x["ts"])
-            
-            # Slater window check (simplified for now: checking if ANY 72h window has > threshold unique senders)
-            # A more robust sliding window could be implemented, but this is a good start.
-            
-            # Correct approach: Slide a window over the sorted transactions
-            unique_senders_in_window = set()
-            start_idx = 0
-            
-            for i in range(len(txns)):
-                current_ts = txns[i]["ts"]
-                
-                # Advance start_idx to keep window within 72 hours
-                while start_idx < i and (current_ts - txns[start_idx]["ts"]) > timedelta(hours=TIME_WINDOW_HOURS):
-                    start_idx += 1
-                
-                # Check unique senders in the current window [start_idx, i]
-                current_window = txns[start_idx : i+1]
-                senders = set(t["sender"] for t in current_window)
-                
-                if len(senders) >= FAN_IN_THRESHOLD:
-                    suspicious_accounts.append({
-                        "account_id": acc,
-                        "suspicion_score": 80.0, # Base high score for smurfing
-                        "detected_patterns": ["fan_in"],
-                        "ring_id": f"SMURF_IN_{acc}"
-                    })
-                    
-                    rings.append({
-                        "ring_id": f"SMURF_IN_{acc}",
-                        "member_accounts": list(senders) + [acc],
-                        "pattern_type": "fan_in",
-                        "risk_score": 85.0,
-                        "detected_at": current_ts.strftime("%Y-%m-%d %H:%M:%S")
-                    })
-                    break # Flag once per account
-
-        # Detect Fan-out
-        for acc, txns in self.fan_out.items():
-            txns.sort(key=lambda x: x["ts"])
-            
-            start_idx = 0
-            for i in range(len(txns)):
-                current_ts = txns[i]["ts"]
-                
-                while start_idx < i and (current_ts - txns[start_idx]["ts"]) > timedelta(hours=TIME_WINDOW_HOURS):
-                    start_idx += 1
-                
-                current_window = txns[start_idx : i+1]
-                receivers = set(t["receiver"] for t in current_window)
-                
-                if len(receivers) >= FAN_OUT_THRESHOLD:
-                    suspicious_accounts.append({
-                        "account_id": acc,
-                        "suspicion_score": 80.0,
-                        "detected_patterns": ["fan_out"],
-                        "ring_id": f"SMURF_OUT_{acc}"
-                    })
-                    
-                    rings.append({
-                        "ring_id": f"SMURF_OUT_{acc}",
-                        "member_accounts": [acc] + list(receivers),
-                        "pattern_type": "fan_out",
-                        "risk_score": 85.0,
-                        "detected_at": current_ts.strftime("%Y-%m-%d %H:%M:%S")
-                    })
-                    break
+        # Fan-in: receivers collecting from many senders
+        for acc, members, detected_at in self.dense_windows(receiver, sender, ts, len(id_map), FAN_IN_THRESHOLD):
+            acc = id_map[acc]
+            suspicious_accounts.append({
+                "account_id": acc,
+                "suspicion_score": 80.0, # Base high score for smurfing
+                "detected_patterns": ["fan_in"],
+                "ring_id": f"SMURF_IN_{acc}"
+            })
+
+            rings.append({
+                "ring_id": f"SMURF_IN_{acc}",
+                "member_accounts": [id_map[m] for m in members] + [acc],
+                "pattern_type": "fan_in",
+                "risk_score": 85.0,
+                "detected_at": format_ts(detected_at)
+            })
+
+        # Fan-out: senders dispersing to many receivers
+        for acc, members, detected_at in self.dense_windows(sender, receiver, ts, len(id_map), FAN_OUT_THRESHOLD):
+            acc = id_map[acc]
+            suspicious_accounts.append({
+                "account_id": acc,
+                "suspicion_score": 80.0,
+                "detected_patterns": ["fan_out"],
+                "ring_id": f"SMURF_OUT_{acc}"
+            })
+
+            rings.append({
+                "ring_id": f"SMURF_OUT_{acc}",
+                "member_accounts": [acc] + [id_map[m] for m in members],
+                "pattern_type": "fan_out",
+                "risk_score": 85.0,
+                "detected_at": format_ts(detected_at)
+            })
 
         return {
             "suspicious_accounts": suspicious_accounts,
             "fraud_rings": rings
         }
+
+    def dense_windows(self, owner, peer, ts, n_accounts, threshold):
+        """
+        Accounts with ``threshold`` distinct peers inside one time window.
+
+        Yields ``(account, peers_in_window, window_end_ts)`` for the first
+        such window of each account, in order of the account's first
+        transaction.
+        """
+        if owner.size == 0:
+            return
+
+        # Group by account, time-ordered within the group (lexsort is stable).
+        order = np.lexsort((ts, owner))
+        owner, peer, ts = owner[order], peer[order], ts[order]
+        starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+        group_ptr = np.r_[starts, owner.size]
+
+        lefts, rights = first_dense_window(group_ptr, peer, ts, n_accounts, TIME_WINDOW_SECONDS, threshold)
+
+        flagged = np.flatnonzero(rights >= 0)
+        first_seen = np.minimum.reduceat(order, starts)[flagged]
+
+        for g in flagged[np.argsort(first_seen, kind="stable")].tolist():
+            lo, hi = lefts[g], rights[g]
+            yield int(owner[lo]), np.unique(peer[lo:hi + 1]).tolist(), int(ts[hi])
@@ -5,10 +5,18 @@ import datetime
 # Add backend to path
 sys.path.append(os.path.join(os.getcwd(), 'backend'))
 
-from circular_fund_detector import CircularFundRoutingDetector
+from _crs_kernels import frequency_score_nb
+from circular_fund_detector import CircularFundRoutingDetector, FULL_FREQUENCY_PASSES
 from smurfing_detector import SmurfingDetector
 from shell_detector import ShellNetworkDetector
 
+def cycle_frequency(detector, txns):
+    """Frequency score of the one cycle in txns."""
+    detector.run(txns)
+    (cycle, edges, max_ts), = detector.detect_cycles()
+    g = detector.graph
+    return frequency_score_nb(edges, g.meta_indptr, g.meta_ts, FULL_FREQUENCY_PASSES)
+
 def test_detectors():
     # 1. Test Circular Detection
     print("Testing Circular Detector...")
@@ -26,6 +34,29 @@ def test_detectors():
     assert len(res['fraud_rings']) == 1
     assert res['fraud_rings'][0]['pattern_type'] == 'cycle'
 
+    # Dates outside the pandas Timestamp range still report detected_at
+    far_txns = [dict(t, timestamp=t["timestamp"].replace("2023", "2300")) for t in c_txns]
+    res = c_detector.run(far_txns)
+    print("Circular far-date Result:", res['fraud_rings'][0]['detected_at'])
+    assert res['fraud_rings'][0]['detected_at'] == "2300-01-01 12:00:00"
+
+    # Frequency counts time-ordered passes around the cycle
+    repeated = [dict(t, timestamp=t["timestamp"].replace("01-01", f"01-0{day}")) for day in (1, 2, 3) for t in c_txns]
+    freq = cycle_frequency(c_detector, repeated)
+    print("Circular 3-pass frequency:", freq)
+    assert freq == 1.0
+
+    backwards = [dict(t, timestamp=f"2023-01-01 {12 - k}:00:00") for k, t in enumerate(c_txns)]
+    freq = cycle_frequency(c_detector, backwards)
+    print("Circular backwards frequency:", freq)
+    assert freq == 0.0
+
+    # Undated transactions cannot be ordered and take part in no pass
+    undated = [dict(t, timestamp="") if t["sender_id"] == "B" else t for t in c_txns]
+    freq = cycle_frequency(c_detector, undated)
+    print("Circular undated frequency:", freq)
+    assert freq == 0.0
+
     # 2. Test Smurfing Detection
     print("\nTesting Smurfing Detector...")
     s_detector = SmurfingDetector()
@@ -45,6 +76,10 @@ def test_detectors():
     assert len(res['fraud_rings']) == 1
     assert res['fraud_rings'][0]['pattern_type'] == 'fan_in'
 
+    res = s_detector.run([dict(t, timestamp="1600-01-01") for t in s_txns])
+    print("Smurfing far-date Result:", res['fraud_rings'][0]['detected_at'])
+    assert res['fraud_rings'][0]['detected_at'] == "1600-01-01 00:00:00"
+
     # 3. Test Shell Detection
     print("\nTesting Shell Detector...")
     sh_detector = ShellNetworkDetector()
@@ -68,5 +103,31 @@ def test_detectors():
     if len(res['fraud_rings']) > 0:
          print("Found shell chain:", res['fraud_rings'][0]['member_accounts'])
 
+    # Chains through a shell-to-shell cycle: X -> S1 -> S2 -> S1, S2 -> Y
+    sh_txns = [
+        {"sender_id": "X", "receiver_id": "S1", "amount": 100},
+        {"sender_id": "S1", "receiver_id": "S2", "amount": 100},
+        {"sender_id": "S2", "receiver_id": "S1", "amount": 100},
+        {"sender_id": "S2", "receiver_id": "Y", "amount": 100},
+    ]
+
+    res = sh_detector.run(sh_txns)
+    print("Shell 2-cycle Result:", [r['member_accounts'] for r in res['fraud_rings']])
+    assert [r['member_accounts'] for r in res['fraud_rings']] == [['S1', 'S2']]
+
+    # X -> S1 -> S2 -> S3 -> S4 -> S2, S3 -> Y
+    sh_txns = [
+        {"sender_id": "X", "receiver_id": "S1", "amount": 100},
+        {"sender_id": "S1", "receiver_id": "S2", "amount": 100},
+        {"sender_id": "S2", "receiver_id": "S3", "amount": 100},
+        {"sender_id": "S3", "receiver_id": "S4", "amount": 100},
+        {"sender_id": "S4", "receiver_id": "S2", "amount": 100},
+        {"sender_id": "S3", "receiver_id": "Y", "amount": 100},
+    ]
+
+    res = sh_detector.run(sh_txns)
+    print("Shell loop Result:", [r['member_accounts'] for r in res['fraud_rings']])
+    assert [r['member_accounts'] for r in res['fraud_rings']] == [['S1', 'S2', 'S3']]
+
 if __name__ == "__main__":
     test_detectors()